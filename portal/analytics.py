@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+import datetime
+from collections import defaultdict
+
+from . import model as m
+from .stats import utc
+
+HOUR = datetime.timedelta(hours=1)
+WEEKDAYS = (
+    'Monday',
+    'Tuesday',
+    'Wednesday',
+    'Thursday',
+    'Friday',
+    'Saturday',
+    'Sunday',
+)
+# percentiles reported for waits and session lengths
+PERCENTILES = (50, 75, 90, 95)
+
+
+def percentiles(values):
+    r"""
+    Gets the PERCENTILES of a list of values, interpolating between ranks
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    out = {}
+    for percentile in PERCENTILES:
+        rank = (len(values) - 1) * percentile / 100
+        lower = int(rank)
+        upper = min(lower + 1, len(values) - 1)
+        value = values[lower] + (values[upper] - values[lower]) * (rank - lower)
+        out['p{}'.format(percentile)] = round(value, 1)
+    return out
+
+
+class Bucket(object):
+    r"""
+    Accumulates the tickets and queue depth for a group of hours
+    """
+
+    def __init__(self):
+        self.waits = []
+        self.serves = []
+        self.tickets = 0
+        self.seconds = 0.0
+        self.depth_seconds = 0.0
+        self.max_depth = 0
+
+    def merge(self, other):
+        self.waits.extend(other.waits)
+        self.serves.extend(other.serves)
+        self.tickets += other.tickets
+        self.seconds += other.seconds
+        self.depth_seconds += other.depth_seconds
+        self.max_depth = max(self.max_depth, other.max_depth)
+
+    def dict(self):
+        return {
+            'tickets': self.tickets,
+            'wait': percentiles(self.waits),
+            'serve': percentiles(self.serves),
+            'avg_depth': round(self.depth_seconds / self.seconds, 2)
+            if self.seconds else None,
+            'max_depth': self.max_depth,
+        }
+
+
+def queue_analytics(session, start, end, timezone=None, now=None):
+    r"""
+    Gets wait times, session lengths, and queue depth by hour and weekday
+    start and end are aware datetimes, hours are in timezone (default UTC)
+    Waits are the minutes from opening to closing a ticket,
+        less the session duration the tutor recorded
+    Queue depth is the number of open or claimed tickets,
+        averaged over time and at its maximum
+    Reads the ticket columns in one query, without loading objects
+    """
+    timezone = timezone or datetime.timezone.utc
+    start = utc(start)
+    end = utc(min(end, now)) if now is not None else utc(end)
+    now = utc(now) if now is not None else end
+
+    # tickets opened during the range, or still waiting when it started
+    rows = session.query(
+        m.Tickets.time_created,
+        m.Tickets.time_closed,
+        m.Tickets.status,
+        m.Tickets.session_duration).\
+        filter(m.Tickets.time_created < end).\
+        filter(
+            (m.Tickets.time_created >= start) |
+            (m.Tickets.time_closed >= start) |
+            (m.Tickets.status != m.Status.Closed))
+
+    # hourly slots from the start of the range, in UTC
+    first = start.replace(minute=0, second=0, microsecond=0)
+    slots = int((end - first) / HOUR) + 1
+    changes = defaultdict(int)
+    waits = defaultdict(list)
+    serves = defaultdict(list)
+    opened = defaultdict(int)
+
+    for created, closed, status, duration in rows:
+        created = utc(created)
+        closed = utc(closed) if status == m.Status.Closed else None
+        changes[max(created, start)] += 1
+        changes[min(closed or now, end)] -= 1
+        if created < start:
+            continue
+        slot = int((created - first) / HOUR)
+        opened[slot] += 1
+        if closed is not None and duration is not None:
+            total = (closed - created).total_seconds() / 60
+            waits[slot].append(max(total - duration, 0))
+            serves[slot].append(duration)
+
+    # sweep the queue depth across the range an hour slot at a time
+    depth_seconds = [0.0] * slots
+    max_depth = [0] * slots
+    depth = 0
+    time = start
+
+    def advance(until):
+        nonlocal time
+        while time < until:
+            slot = int((time - first) / HOUR)
+            boundary = min(first + (slot + 1) * HOUR, until)
+            depth_seconds[slot] += depth * (boundary - time).total_seconds()
+            max_depth[slot] = max(max_depth[slot], depth)
+            time = boundary
+
+    for change_time in sorted(changes):
+        advance(min(max(change_time, start), end))
+        depth += changes[change_time]
+        if time < end:
+            slot = int((time - first) / HOUR)
+            max_depth[slot] = max(max_depth[slot], depth)
+    advance(end)
+
+    # group the slots by weekday and hour in the local timezone
+    buckets = defaultdict(Bucket)
+    for slot in range(slots):
+        slot_start = first + slot * HOUR
+        seconds = (min(slot_start + HOUR, end) - max(slot_start, start))
+        if seconds <= datetime.timedelta(0):
+            continue
+        local = slot_start.replace(tzinfo=datetime.timezone.utc).\
+            astimezone(timezone)
+        bucket = buckets[local.weekday(), local.hour]
+        bucket.seconds += seconds.total_seconds()
+        bucket.depth_seconds += depth_seconds[slot]
+        bucket.max_depth = max(bucket.max_depth, max_depth[slot])
+        bucket.tickets += opened[slot]
+        bucket.waits.extend(waits[slot])
+        bucket.serves.extend(serves[slot])
+
+    total = Bucket()
+    hours = defaultdict(Bucket)
+    weekdays = defaultdict(Bucket)
+    for (weekday, hour), bucket in buckets.items():
+        total.merge(bucket)
+        hours[hour].merge(bucket)
+        weekdays[weekday].merge(bucket)
+
+    return {
+        'total': total.dict(),
+        'by_hour': [
+            dict(hours[hour].dict(), hour=hour)
+            for hour in range(24)
+            if hour in hours
+        ],
+        'by_weekday': [
+            dict(weekdays[weekday].dict(),
+                 weekday=weekday, name=WEEKDAYS[weekday])
+            for weekday in range(7)
+            if weekday in weekdays
+        ],
+        'by_weekday_hour': [
+            dict(buckets[key].dict(), weekday=key[0], hour=key[1])
+            for key in sorted(buckets)
+        ],
+    }
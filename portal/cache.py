@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import stat
+import uuid
+import threading
+import tempfile
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+def private_directory(path):
+    r"""
+    Creates a directory that only this user can read or write
+    Raises PermissionError if it already exists and belongs to another user
+        or others can write to it, its files could have been planted
+    Returns the path
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_mode & 0o077 or (
+            hasattr(os, 'getuid') and info.st_uid != os.getuid()):
+        raise PermissionError(
+            'Cache directory is not private to this user: ' + path)
+    return path
+
+
+class StatusCache(object):
+    r"""
+    Caches the status page payloads until the data behind them changes
+    Every write that affects the status page calls invalidate(),
+        which bumps a version number shared by all cached values
+    If a directory is given the version and payloads are stored there
+        so that every worker process shares one computation per change
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.local_version = 0
+        self.local_modified = time.time()
+        self.values = {}
+        self.hits = 0
+        self.misses = 0
+        # functions called after every invalidation
+        self.listeners = []
+        if self.directory:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            self.instance = self._instance()
+        else:
+            self.instance = uuid.uuid4().hex[:12]
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _instance(self):
+        r"""
+        Gets the id of the shared cache directory, creating it if needed
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'w') as f:
+            f.write(uuid.uuid4().hex[:12])
+        try:
+            # link fails if another process created it first
+            os.link(tmp, self._path('instance'))
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp)
+        with open(self._path('instance')) as f:
+            return f.read().strip()
+
+    def tag(self):
+        r"""
+        Returns a string identifying the current data version
+        Differs between processes unless the cache directory is shared
+        """
+        return '{}-{}'.format(self.instance, self.version())
+
+    def modified(self):
+        r"""
+        Returns the timestamp of the last invalidation
+        """
+        if not self.directory:
+            return self.local_modified
+        for name in ('version', 'instance'):
+            try:
+                return os.path.getmtime(self._path(name))
+            except OSError:
+                pass
+        return self.local_modified
+
+    def version(self):
+        r"""
+        Returns the current data version
+        """
+        if not self.directory:
+            return self.local_version
+        try:
+            with open(self._path('version')) as f:
+                return int(f.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def invalidate(self):
+        r"""
+        Marks all cached payloads as stale
+        Should be called after committing a change to the status data
+        """
+        with self.lock:
+            self.values.clear()
+            if self.directory:
+                with open(self._path('version.lock'), 'a') as lock:
+                    if fcntl is not None:
+                        fcntl.flock(lock, fcntl.LOCK_EX)
+                    self._write('version', str(self.version() + 1))
+            else:
+                self.local_version += 1
+                self.local_modified = time.time()
+        for listener in self.listeners:
+            listener()
+
+    def _write(self, name, text):
+        r"""
+        Atomically replaces a file in the cache directory
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(tmp, self._path(name))
+
+    def _read_shared(self, key, version):
+        r"""
+        Reads a payload written by another worker, if it is current
+        """
+        try:
+            with open(self._path(key + '.json')) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') == version:
+            return data
+        return None
+
+    def get(self, key, compute, shared=True):
+        r"""
+        Returns the cached value for key
+        Calls compute() to rebuild it if the data has changed
+        Values must be json serializable when a directory is used
+        If shared is False the value is only cached in this process
+        """
+        with self.lock:
+            version = self.version()
+            cached = self.values.get(key)
+            if cached is not None and cached[0] == version:
+                self.hits += 1
+                return cached[1]
+
+            shared = shared and self.directory
+            if shared:
+                data = self._read_shared(key, version)
+                if data is not None:
+                    self.hits += 1
+                    self.values[key] = (version, data['value'])
+                    return data['value']
+
+            self.misses += 1
+            value = compute()
+            self.values[key] = (version, value)
+            if shared:
+                self._write(key + '.json', json.dumps({
+                    'version': version,
+                    'value': value,
+                }))
+            return value
+
+    def stats(self):
+        r"""
+        Returns the hit and miss counters for this process
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'version': self.version(),
+        }
+
+
+class LRUCache(object):
+    r"""
+    Keeps the most recently used values, each with the data version
+        it was computed at
+    Values are computed outside the lock, so a slow computation
+        doesn't hold up lookups of other keys
+    """
+
+    def __init__(self, size=256):
+        self.size = size
+        self.lock = threading.Lock()
+        self.values = OrderedDict()
+
+    def get(self, key, version, compute):
+        r"""
+        Returns the value for key if it was computed at version
+        Otherwise calls compute() and keeps the result,
+            dropping the least recently used value when full
+        """
+        with self.lock:
+            cached = self.values.get(key)
+            if cached is not None and cached[0] == version:
+                self.values.move_to_end(key)
+                return cached[1]
+        value = compute()
+        with self.lock:
+            self.values[key] = (version, value)
+            self.values.move_to_end(key)
+            while len(self.values) > self.size:
+                self.values.popitem(last=False)
+        return value
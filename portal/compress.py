@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+import zlib
+
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# content types worth compressing, anything else is sent as is
+COMPRESSIBLE = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+)
+# streams that must reach the client as soon as each part is written
+UNBUFFERED = (
+    'text/event-stream',
+)
+
+
+class GzipEncoder(object):
+    r"""
+    Writes a gzip stream
+    """
+
+    def __init__(self, level):
+        self.zlib = zlib.compressobj(
+            min(level, 9), zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self.zlib.compress(data)
+
+    def flush(self):
+        return self.zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.zlib.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder(object):
+    r"""
+    Writes a brotli stream, quality takes the place of the gzip level
+    """
+
+    def __init__(self, level):
+        self.brotli = brotli.Compressor(quality=min(level, 11))
+
+    def compress(self, data):
+        return self.brotli.process(data)
+
+    def flush(self):
+        return self.brotli.flush()
+
+    def finish(self):
+        return self.brotli.finish()
+
+
+ENCODERS = {'gzip': GzipEncoder}
+if brotli is not None:
+    ENCODERS['br'] = BrotliEncoder
+
+
+class Compressed(object):
+    r"""
+    Compresses responses for clients that accept gzip or brotli
+    Brotli is only offered when the brotli package is installed
+    Responses with a Content-Length under COMPRESS_MIN_SIZE bytes,
+        responses that are already encoded, and content types that don't
+        compress well are passed through unchanged
+    Streamed responses are compressed one part at a time
+    config is read on every request so changes apply without a restart
+    """
+
+    def __init__(self, app, config):
+        self.app = app
+        self.config = config
+
+    def encoding(self, environ):
+        r"""
+        Picks the encoding the client prefers, None for no compression
+        """
+        accept = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING'))
+        best = None
+        for name in ENCODERS:
+            quality = accept.quality(name)
+            if quality > 0 and (best is None or quality > best[0]):
+                best = (quality, name)
+        return best and best[1]
+
+    def __call__(self, environ, start_response):
+        encoding = self.encoding(environ)
+        if encoding is None or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.app(environ, start_response)
+
+        state = {}
+
+        def compressing_start_response(status, headers, exc_info=None):
+            encoder = self.encoder(status, headers, encoding)
+            if encoder is not None:
+                state['encoder'] = encoder
+                state['stream'] = not any(
+                    key.lower() == 'content-length' for key, _ in headers)
+                headers = self.encoded_headers(headers, encoding)
+            write = start_response(status, headers, exc_info)
+            if encoder is None:
+                return write
+
+            def compressing_write(data):
+                write(encoder.compress(data) + encoder.flush())
+            return compressing_write
+
+        body = self.app(environ, compressing_start_response)
+        if 'encoder' not in state:
+            return body
+        return self.compress(body, state['encoder'], state['stream'])
+
+    def encoder(self, status, headers, encoding):
+        r"""
+        Gets an encoder for a response, None if it shouldn't be compressed
+        """
+        if not status.startswith('200'):
+            return None
+        headers = {key.lower(): value for key, value in headers}
+        content_type = headers.get('content-type', '').split(';')[0].strip()
+        if not content_type.startswith(COMPRESSIBLE):
+            return None
+        if content_type in UNBUFFERED:
+            return None
+        if 'content-encoding' in headers:
+            return None
+        if 'no-transform' in headers.get('cache-control', ''):
+            return None
+        length = headers.get('content-length')
+        if length is not None and \
+                int(length) < int(self.config.get('COMPRESS_MIN_SIZE', 500)):
+            return None
+        level = int(self.config.get('COMPRESS_LEVEL', 6))
+        return ENCODERS[encoding](level)
+
+    def encoded_headers(self, headers, encoding):
+        r"""
+        Updates response headers for a compressed body
+        """
+        out = []
+        vary = None
+        for key, value in headers:
+            name = key.lower()
+            if name == 'content-length':
+                continue
+            if name == 'etag' and not value.startswith('W/'):
+                # the compressed bytes differ, so the tag can only be weak
+                value = 'W/' + value
+            if name == 'vary':
+                vary = value
+                continue
+            out.append((key, value))
+        if vary and vary.strip() != '*':
+            vary = vary + ', Accept-Encoding'
+        out.append(('Vary', vary or 'Accept-Encoding'))
+        out.append(('Content-Encoding', encoding))
+        return out
+
+    def compress(self, body, encoder, stream):
+        r"""
+        Compresses a response body as it is iterated
+        Streamed bodies are flushed after every part so the client
+            receives data as soon as it is generated
+        """
+        try:
+            for data in body:
+                data = encoder.compress(data)
+                if stream:
+                    data += encoder.flush()
+                if data:
+                    yield data
+            yield encoder.finish()
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
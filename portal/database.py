@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+import os
+import sqlite3
+import contextlib
+
+from sqlalchemy import event, orm
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.selectable import SelectBase
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+
+# bind key of the optional read only database
+REPLICA = 'replica'
+
+
+def env_int(name, default=None):
+    r"""
+    Gets an integer from the environment
+    """
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    return int(value)
+
+
+def env_bool(name, default=False):
+    r"""
+    Gets a boolean from the environment
+    """
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def database_uri():
+    r"""
+    Gets the database url from the environment
+    DB_URL takes any SQLAlchemy url, otherwise DB is a SQLite file path
+    """
+    url = os.environ.get('DB_URL')
+    if url:
+        return url
+    return 'sqlite:///' + os.environ['DB']
+
+
+def replica_uri():
+    r"""
+    Gets the read replica url from the environment, if there is one
+    DB_READ_URL takes any SQLAlchemy url, DB_READ is a SQLite file path
+    """
+    url = os.environ.get('DB_READ_URL')
+    if url:
+        return url
+    if os.environ.get('DB_READ'):
+        return 'sqlite:///' + os.environ['DB_READ']
+    return None
+
+
+def configure(app):
+    r"""
+    Sets the database url and connection pool from the environment
+    DB_POOL_SIZE: connections kept open per worker process
+    DB_MAX_OVERFLOW: extra connections allowed under load
+    DB_POOL_TIMEOUT: seconds to wait for a free connection
+    DB_POOL_RECYCLE: seconds before a connection is replaced
+    DB_POOL_PRE_PING: test connections before using them
+    DB_BUSY_TIMEOUT: milliseconds SQLite waits for a lock
+    """
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri()
+    replica = replica_uri()
+    if replica:
+        app.config['SQLALCHEMY_BINDS'] = {REPLICA: replica}
+    settings = {
+        'SQLALCHEMY_POOL_SIZE': env_int('DB_POOL_SIZE'),
+        'SQLALCHEMY_MAX_OVERFLOW': env_int('DB_MAX_OVERFLOW'),
+        'SQLALCHEMY_POOL_TIMEOUT': env_int('DB_POOL_TIMEOUT'),
+        'SQLALCHEMY_POOL_RECYCLE': env_int('DB_POOL_RECYCLE'),
+    }
+    for key, value in settings.items():
+        if value is not None:
+            app.config[key] = value
+    app.config['DB_POOL_PRE_PING'] = env_bool('DB_POOL_PRE_PING')
+    app.config['DB_BUSY_TIMEOUT'] = env_int('DB_BUSY_TIMEOUT', 5000)
+
+
+class RoutingSession(SignallingSession):
+    r"""
+    Session that can send its reads to the read replica
+    Flushes and insert, update, and delete statements always use the primary
+    info['replica'] turns on replica reads for the rest of the session
+    info['wrote'] is set once the session writes to the primary
+    """
+
+    def get_bind(self, mapper=None, clause=None):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info['wrote'] = True
+        elif self.info.get('replica') and isinstance(clause, SelectBase):
+            return get_state(self.app).db.get_engine(self.app, bind=REPLICA)
+        return super().get_bind(mapper, clause)
+
+
+class Database(SQLAlchemy):
+    r"""
+    Flask-SQLAlchemy with the engine options it does not expose
+        and an optional read replica
+    """
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    @property
+    def has_replica(self):
+        return REPLICA in (self.get_app().config['SQLALCHEMY_BINDS'] or ())
+
+    def use_replica(self):
+        r"""
+        Sends the reads of the current session to the read replica
+        Does nothing if there is no replica
+        """
+        if self.has_replica:
+            self.session.info['replica'] = True
+
+    @property
+    def reading_replica(self):
+        r"""
+        Checks if the reads of the current session go to the read replica
+        """
+        return bool(self.session.info.get('replica'))
+
+    @contextlib.contextmanager
+    def use_primary(self):
+        r"""
+        Sends the reads inside the block to the primary
+        For reads that must not lag, like the logged in user
+        """
+        info = self.session.info
+        replica = info.pop('replica', False)
+        try:
+            yield
+        finally:
+            if replica:
+                info['replica'] = True
+
+    def apply_driver_hacks(self, app, info, options):
+        super().apply_driver_hacks(app, info, options)
+        if app.config.get('DB_POOL_PRE_PING'):
+            options['pool_pre_ping'] = True
+        if info.drivername.startswith('sqlite'):
+            connect_args = options.setdefault('connect_args', {})
+            connect_args['timeout'] = app.config['DB_BUSY_TIMEOUT'] / 1000
+            # sqlite files default to no pool, which ignores the pool size
+            # pooled connections are handed between request threads
+            if options.get('pool_size') and 'poolclass' not in options:
+                options['poolclass'] = QueuePool
+                connect_args['check_same_thread'] = False
+
+
+def pool_status(engine):
+    r"""
+    Gets the connection counts of an engine's pool
+    Returns None for pools that don't keep connections, like SQLite's default
+    """
+    pool = engine.pool
+    if not hasattr(pool, 'checkedout'):
+        return None
+    return {
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'idle': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+    }
+
+
+@event.listens_for(Engine, 'connect')
+def tune_sqlite(dbapi_connection, connection_record):
+    r"""
+    Lets SQLite readers and a writer work at the same time
+    WAL mode keeps readers from blocking the writer,
+        and NORMAL sync only fsyncs at checkpoints
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    timeout = env_int('DB_BUSY_TIMEOUT', 5000)
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA busy_timeout = {:d}'.format(timeout))
+    cursor.execute('PRAGMA journal_mode = WAL')
+    cursor.execute('PRAGMA synchronous = NORMAL')
+    cursor.close()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ReportJobs(object):
+    r"""
+    Generates report files on a pool of background threads
+    Files are named by a hash of the report filters and the data version,
+        so an identical request made before the data changes
+        is served from the file that is already there
+    Job status is stored next to the files, so any worker process
+        sharing the directory can answer status requests
+    """
+
+    def __init__(self, directory=None, workers=2,
+                 keep_seconds=3600, stale_seconds=600):
+        r"""
+        directory: where files are kept, created private to this user,
+            defaults to a new temporary directory for this process
+        workers: number of reports generated at the same time
+        keep_seconds: finished files older than this are removed
+        stale_seconds: unfinished jobs older than this are assumed lost
+        """
+        self.directory = directory or tempfile.mkdtemp(prefix='portal-')
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        self.keep_seconds = keep_seconds
+        self.stale_seconds = stale_seconds
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.running = set()
+
+    def key(self, filters, version):
+        r"""
+        Gets the job id for report filters at a data version
+        """
+        text = json.dumps([sorted(filters.items()), version])
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    def path(self, id, extension='.csv'):
+        return os.path.join(self.directory, id + extension)
+
+    def valid(self, id):
+        return len(id) == 40 and all(c in '0123456789abcdef' for c in id)
+
+    def status(self, id):
+        r"""
+        Gets the status of a job: queued, running, done, or failed
+        Returns None for unknown jobs
+        """
+        if not self.valid(id):
+            return None
+        if os.path.exists(self.path(id)):
+            return {'id': id, 'status': 'done'}
+        try:
+            with open(self.path(id, '.json')) as f:
+                status = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if status['status'] in ('queued', 'running') and \
+                time.time() - status['time'] > self.stale_seconds:
+            return None
+        return status
+
+    def _set_status(self, id, status, **extra):
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(dict(extra, id=id, status=status, time=time.time()), f)
+        os.replace(tmp, self.path(id, '.json'))
+
+    def submit(self, id, write):
+        r"""
+        Starts a job unless it is already finished or in progress
+        write(file) writes the report to an open text file
+        Returns the job status
+        """
+        status = self.status(id)
+        if status is not None and status['status'] != 'failed':
+            return status
+        with self.lock:
+            if id in self.running:
+                return self.status(id)
+            self.running.add(id)
+        self.cleanup()
+        self._set_status(id, 'queued')
+        self.pool.submit(self._run, id, write)
+        return self.status(id)
+
+    def _run(self, id, write):
+        try:
+            self._set_status(id, 'running')
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.part')
+            try:
+                with os.fdopen(fd, 'w', newline='') as f:
+                    write(f)
+                os.replace(tmp, self.path(id))
+            except BaseException:
+                os.remove(tmp)
+                raise
+            self._set_status(id, 'done')
+        except Exception as e:
+            self._set_status(id, 'failed', error=str(e))
+        finally:
+            with self.lock:
+                self.running.discard(id)
+
+    def cleanup(self):
+        r"""
+        Removes files that are older than keep_seconds
+        """
+        cutoff = time.time() - self.keep_seconds
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import time
+import bisect
+import tempfile
+import logging
+import threading
+from collections import defaultdict
+
+log = logging.getLogger(__name__)
+# request latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def escape(value):
+    return str(value).\
+        replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def sample(name, labels, value):
+    r"""
+    Formats one line of the Prometheus text format
+    """
+    if labels:
+        name += '{' + ','.join(
+            '{}="{}"'.format(key, escape(label)) for key, label in labels
+        ) + '}'
+    if value == int(value):
+        value = int(value)
+    return '{} {}'.format(name, value)
+
+
+class Metrics(object):
+    r"""
+    Counters, histograms, and gauges in the Prometheus text format
+    Each worker process keeps its own values in memory
+    If a directory is given every worker writes its values there
+        every flush_seconds, and render() adds up the counters
+        and histograms of all workers sharing the directory
+    Gauges belong to one worker and are labeled with its process id,
+        gauges of workers that stopped writing for stale_seconds are left out
+    """
+
+    def __init__(self, directory=None, flush_seconds=5, stale_seconds=60):
+        self.directory = directory
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        self.flush_seconds = flush_seconds
+        self.stale_seconds = stale_seconds
+        self.lock = threading.Lock()
+        # process the flush thread was started in
+        self.pid = None
+        # name: (type, help, buckets)
+        self.families = {}
+        # (name, labels): value, or bucket counts followed by the sum
+        self.values = {}
+        # functions returning (name, labels, value) samples for this worker
+        self.collectors = []
+
+    def describe(self, name, kind, help, buckets=None):
+        r"""
+        Declares a metric, kind is counter, gauge, or histogram
+        """
+        self.families[name] = (kind, help, buckets)
+
+    def inc(self, name, labels=(), value=1):
+        r"""
+        Adds to a counter, labels is a tuple of (label, value) pairs
+        """
+        self.start()
+        key = (name, tuple(labels))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        r"""
+        Adds an observation to a histogram
+        """
+        self.start()
+        buckets = self.families[name][2]
+        key = (name, tuple(labels))
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [0] * (len(buckets) + 2)
+            counts[bisect.bisect_left(buckets, value)] += 1
+            counts[-1] += value
+
+    def collect(self):
+        r"""
+        Gets this worker's values, including the collectors
+        """
+        with self.lock:
+            values = {
+                key: list(value) if isinstance(value, list) else value
+                for key, value in self.values.items()
+            }
+        for collector in self.collectors:
+            for name, labels, value in collector():
+                values[name, tuple(labels)] = value
+        return values
+
+    def _path(self, pid):
+        return os.path.join(self.directory, 'worker-{}.json'.format(pid))
+
+    def start(self):
+        r"""
+        Starts writing this worker's values every flush_seconds
+        Runs on the first update in each process,
+            so workers forked after import get their own thread
+        """
+        if not self.directory or self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception:
+                log.exception('Could not write metrics')
+
+    def flush(self):
+        r"""
+        Writes this worker's values to the shared directory
+        """
+        if not self.directory:
+            return
+        now = time.time()
+        values = [
+            [name, labels, value]
+            for (name, labels), value in self.collect().items()
+        ]
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'time': now, 'values': values}, f)
+        os.replace(tmp, self._path(os.getpid()))
+
+    def _workers(self):
+        r"""
+        Reads the values of every worker, with this worker's current values
+        """
+        pid = os.getpid()
+        workers = {str(pid): (time.time(), self.collect())}
+        if not self.directory:
+            return workers
+        for entry in os.scandir(self.directory):
+            if not entry.name.startswith('worker-') or \
+                    entry.name == os.path.basename(self._path(pid)):
+                continue
+            try:
+                with open(entry.path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            workers[entry.name[7:-5]] = (data['time'], {
+                (name, tuple(tuple(label) for label in labels)): value
+                for name, labels, value in data['values']
+            })
+        return workers
+
+    def render(self, samples=()):
+        r"""
+        Gets every metric in the Prometheus text format
+        samples are extra (name, labels, value) gauges
+            that already cover every worker
+        """
+        self.flush()
+        totals = {}
+        now = time.time()
+        for pid, (written, values) in self._workers().items():
+            for (name, labels), value in values.items():
+                kind = self.families[name][0]
+                if kind == 'gauge':
+                    if now - written < self.stale_seconds:
+                        totals[name, labels + (('worker', pid),)] = value
+                elif kind == 'histogram':
+                    total = totals.setdefault(
+                        (name, labels), [0] * len(value))
+                    for i, count in enumerate(value):
+                        total[i] += count
+                else:
+                    totals[name, labels] = totals.get((name, labels), 0) + \
+                        value
+        for name, labels, value in samples:
+            totals[name, tuple(labels)] = value
+
+        families = defaultdict(list)
+        for (name, labels), value in totals.items():
+            families[name].append((labels, value))
+
+        lines = []
+        for name in sorted(families):
+            kind, help, buckets = self.families[name]
+            lines.append('# HELP {} {}'.format(name, help))
+            lines.append('# TYPE {} {}'.format(name, kind))
+            for labels, value in sorted(families[name], key=str):
+                if kind != 'histogram':
+                    lines.append(sample(name, labels, value))
+                    continue
+                count = 0
+                for bound, n in zip(buckets + ('+Inf',), value):
+                    count += n
+                    lines.append(sample(
+                        name + '_bucket', labels + (('le', bound),), count))
+                lines.append(sample(name + '_sum', labels, value[-1]))
+                lines.append(sample(name + '_count', labels, count))
+        return '\n'.join(lines) + '\n'
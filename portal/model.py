@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 
 import enum
+import datetime
+from operator import attrgetter
 
 from sqlalchemy import (
     Column,
@@ -11,8 +13,10 @@ from sqlalchemy import (
     Date,
     Enum,
     ForeignKey,
+    Index,
+    inspect,
 )
-from sqlalchemy.schema import Table
+from sqlalchemy.schema import Table, CreateColumn
 from sqlalchemy.orm import relationship, column_property
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql.expression import cast
@@ -20,6 +24,13 @@ from sqlalchemy.sql.expression import cast
 EMAIL = String(256)
 
 
+def utcnow():
+    r"""
+    The current time in UTC, used for modification timestamps
+    """
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
 class Base:
     def dict(self):
         '''
@@ -52,6 +63,8 @@ can_tutor_table = Table(
         ForeignKey('courses.course_id', onupdate=onupdate, ondelete=cascade),
         primary_key=True,
         doc='The course that a tutor can tutor'),
+    # the primary key only covers lookups by tutor
+    Index('ix_can_tutor_course_id', 'course_id'),
 )
 
 
@@ -109,6 +122,19 @@ class Tickets (Base):
     Records the details of a tutoring session
     """
     __tablename__ = 'tickets'
+    __table_args__ = (
+        # open/claimed tickets for the queue and status page
+        Index('ix_tickets_status_time_created',
+              'ticket_status', 'ticket_time_created'),
+        # reports and keyset pages
+        Index('ix_tickets_time_created', 'ticket_time_created', 'ticket_id'),
+        # tickets closed today
+        Index('ix_tickets_time_closed', 'ticket_time_closed'),
+        # tickets changed since a tutor last checked the queue
+        Index('ix_tickets_time_modified', 'ticket_time_modified'),
+        # open tickets per course for the status page
+        Index('ix_tickets_section_id_status', 'section_id', 'ticket_status'),
+    )
 
     id = Column(
         'ticket_id', Integer,
@@ -145,6 +171,15 @@ class Tickets (Base):
     time_closed = Column(
         'ticket_time_closed', DateTime(True),
         doc='Time a tutor marked the ticket as closed')
+    time_modified = Column(
+        'ticket_time_modified', DateTime(True),
+        default=utcnow,
+        onupdate=utcnow,
+        doc='Time the ticket was last changed')
+    version = Column(
+        'ticket_version', Integer,
+        default=1,
+        doc='Incremented on every claim, close, or reopen')
     session_duration = Column(
         'ticket_session_duration', Integer,
         doc='The amount of time the tutors actually spent with the student')
@@ -246,6 +281,9 @@ class Tutors (Base):
     Also allows tickets to specify a tutor and assisting tutor
     """
     __tablename__ = 'tutors'
+    __table_args__ = (
+        Index('ix_tutors_is_working', 'tutor_is_working'),
+    )
 
     id = Column(
         'tutor_id', Integer,
@@ -333,6 +371,10 @@ class Sections (Base):
     The sections of the various courses offered during a given semester
     """
     __tablename__ = 'sections'
+    __table_args__ = (
+        Index('ix_sections_course_id_semester_id', 'course_id', 'semester_id'),
+        Index('ix_sections_semester_id', 'semester_id'),
+    )
 
     id = Column(
         'section_id', Integer,
@@ -485,9 +527,187 @@ class Semesters (Base):
         return '{} {:04}'.format(self.season.name, self.year)
 
 
-if __name__ == '__main__':
-    from operator import attrgetter
+# upper bounds in minutes of the wait time histogram in DailyStats
+WAIT_BUCKETS = (5, 10, 15, 20, 30, 45, 60, 90, 120)
+
+
+class DailyStats (Base):
+    r"""
+    Ticket totals for each day, section, problem type, and tutor
+    Kept up to date as tickets change so statistics don't scan every ticket
+    Days are the UTC date a ticket was created
+    Missing problem types and tutors are stored as 0
+    Waits are counted in a histogram so medians can be estimated
+    """
+    __tablename__ = 'daily_stats'
+    __table_args__ = (
+        Index('ix_daily_stats_key', 'stats_day', 'section_id',
+              'problem_type_id', 'tutor_id', unique=True),
+    )
+
+    id = Column(
+        'stats_id', Integer,
+        primary_key=True,
+        doc='An autonumber id')
+    day = Column(
+        'stats_day', Date,
+        nullable=False,
+        doc='The day the tickets were created')
+    section_id = Column(
+        Integer,
+        nullable=False,
+        doc='The section the tickets were for')
+    problem_type_id = Column(
+        Integer,
+        nullable=False,
+        doc='The problem type of the tickets, 0 for none')
+    tutor_id = Column(
+        Integer,
+        nullable=False,
+        doc='The tutor of the tickets, 0 for none')
+    tickets = Column(
+        'stats_tickets', Integer,
+        nullable=False, default=0,
+        doc='The number of tickets')
+    closed = Column(
+        'stats_closed', Integer,
+        nullable=False, default=0,
+        doc='The number of closed tickets')
+    duration_sum = Column(
+        'stats_duration_sum', Integer,
+        nullable=False, default=0,
+        doc='The total session duration of closed tickets')
+    duration_count = Column(
+        'stats_duration_count', Integer,
+        nullable=False, default=0,
+        doc='The number of closed tickets with a session duration')
+    successful = Column(
+        'stats_successful', Integer,
+        nullable=False, default=0,
+        doc='The number of closed tickets that were successful')
+    wait_5 = Column(
+        'stats_wait_5', Integer,
+        nullable=False, default=0,
+        doc='Closed tickets that were closed within 5 minutes')
+    wait_10 = Column(
+        'stats_wait_10', Integer,
+        nullable=False, default=0,
+        doc='Closed tickets that were closed within 5 to 10 minutes')
+    wait_15 = Column(
+        'stats_wait_15', Integer,
+        nullable=False, default=0,
+        doc='Closed tickets that were closed within 10 to 15 minutes')
+    wait_20 = Column(
+        'stats_wait_20', Integer,
+        nullable=False, default=0,
+        doc='Closed tickets that were closed within 15 to 20 minutes')
+    wait_30 = Column(
+        'stats_wait_30', Integer,
+        nullable=False, default=0,
+        doc='Closed tickets that were closed within 20 to 30 minutes')
+    wait_45 = Column(
+        'stats_wait_45', Integer,
+        nullable=False, default=0,
+        doc='Closed tickets that were closed within 30 to 45 minutes')
+    wait_60 = Column(
+        'stats_wait_60', Integer,
+        nullable=False, default=0,
+        doc='Closed tickets that were closed within 45 to 60 minutes')
+    wait_90 = Column(
+        'stats_wait_90', Integer,
+        nullable=False, default=0,
+        doc='Closed tickets that were closed within 60 to 90 minutes')
+    wait_120 = Column(
+        'stats_wait_120', Integer,
+        nullable=False, default=0,
+        doc='Closed tickets that were closed within 90 to 120 minutes')
+    wait_over = Column(
+        'stats_wait_over', Integer,
+        nullable=False, default=0,
+        doc='Closed tickets that were closed after more than 120 minutes')
+
+    # the wait histogram columns, in order of WAIT_BUCKETS
+    waits = ['wait_{}'.format(bucket) for bucket in WAIT_BUCKETS]
+    waits.append('wait_over')
+    # every column that is a total
+    totals = [
+        'tickets',
+        'closed',
+        'duration_sum',
+        'duration_count',
+        'successful',
+    ] + waits
+
+
+# statements that add a column, by dialect, the default is standard SQL
+ADD_COLUMN = {
+    'mssql': 'ALTER TABLE {table} ADD {column}',
+    'oracle': 'ALTER TABLE {table} ADD ({column})',
+}
+
+
+def add_column_ddl(table, column, dialect):
+    r"""
+    Gets the statement that adds a column to a table in a dialect
+    """
+    return ADD_COLUMN.get(
+        dialect.name, 'ALTER TABLE {table} ADD COLUMN {column}').format(
+        table=dialect.identifier_preparer.format_table(table),
+        column=CreateColumn(column).compile(dialect=dialect),
+    )
+
+
+def add_columns(engine):
+    r"""
+    Adds any declared columns missing from existing tables
+    create_all doesn't alter existing tables
+    Only nullable columns can be added this way
+    Returns the names of the columns added
+    """
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    added = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                engine.execute(
+                    add_column_ddl(table, column, engine.dialect))
+                added.append('{}.{}'.format(table.name, column.name))
+    return added
 
+
+def migrate(engine):
+    r"""
+    Brings an existing database up to date with the declared schema
+    """
+    add_columns(engine)
+    create_indexes(engine)
+
+
+def create_indexes(engine):
+    r"""
+    Adds any declared indexes missing from an existing database
+    create_all only creates indexes along with new tables
+    Returns the names of the indexes created
+    """
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    created = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {i['name'] for i in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=attrgetter('name')):
+            if index.name not in existing:
+                index.create(engine)
+                created.append(index.name)
+    return created
+
+
+if __name__ == '__main__':
     for table in sorted(Base.metadata.tables.values(), key=attrgetter('name')):
         print(table.name)
         for column in table.columns:
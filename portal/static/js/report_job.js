@@ -0,0 +1,33 @@
+// Generates a report in the background and downloads it when it is done
+const report_job_messages = {
+    queued: 'Waiting to start...',
+    running: 'Preparing report...',
+    failed: 'The report could not be generated',
+};
+
+function report_job_update(job){
+    $('#report-job-status').text(report_job_messages[job.status] || '');
+    if (job.status == 'done'){
+        $('#report-job').prop('disabled', false);
+        window.location = job.download;
+    }
+    else if (job.status == 'failed'){
+        $('#report-job').prop('disabled', false);
+    }
+    else {
+        setTimeout(function(){
+            $.getJSON(job.url).done(report_job_update).fail(function(){
+                report_job_update({status: 'failed'});
+            });
+        }, 2000);
+    }
+}
+
+$(function(){
+    $('#report-job').click(function(){
+        $(this).prop('disabled', true);
+        $.post($(this).attr('data-url')).done(report_job_update).fail(function(){
+            report_job_update({status: 'failed'});
+        });
+    });
+});
@@ -0,0 +1,71 @@
+// Keeps the ticket queue up to date by polling for changed tickets
+let since;
+const actions = {
+    open: 'Claim',
+    claimed: 'Close',
+    closed: 'Reopen',
+};
+
+function ticket_row(item){
+    let row = $('<li class="list-group-item row"></li>');
+    row.attr('data-id', item.id);
+    row.attr('data-created', item.time_created);
+    let columns = [
+        ['col-xs-10 col-sm-12 time', item.time_created],
+        ['col-xs-4 col-sm-2 col-md-2 name', item.student_fullname],
+        ['col-xs-8 col-sm-4 col-md-3 course', item.course],
+        ['col-xs-10 col-sm-4 col-md-3 assignment', item.assignment],
+        ['col-xs-10 col-sm-10 col-md-10 question', item.question],
+    ];
+    for (let [cls, text] of columns){
+        row.append($('<div></div>').addClass(cls).text(text || ''));
+    }
+    row.append(
+        $('<a type="button" class="badge"></a>')
+            .attr('href', item.url)
+            .text(actions[item.status])
+    );
+    return row;
+}
+
+function insert_sorted(list, row){
+    let created = row.attr('data-created');
+    let after = list.children('li').filter(function(){
+        return $(this).attr('data-created') > created;
+    }).first();
+    if (after.length){
+        row.insertBefore(after);
+    }
+    else {
+        list.append(row);
+    }
+}
+
+function apply_changes(data){
+    since = data.since;
+    let current = new Set(data.ids.map(String));
+    $('#ticket-queue li[data-id]').each(function(){
+        if (!current.has($(this).attr('data-id'))){
+            $(this).remove();
+        }
+    });
+    for (let item of data.tickets){
+        $('#ticket-queue li[data-id="{0}"]'.format(item.id)).remove();
+        insert_sorted($('#' + item.status), ticket_row(item));
+    }
+}
+
+function poll(){
+    $.ajax({
+        url: '/api/tickets',
+        type: 'GET',
+        dataType: 'json',
+        data: {since: since},
+        success: apply_changes,
+    });
+}
+
+$(function(){
+    since = $('#ticket-queue').attr('data-since');
+    setInterval(poll, 15 * 1000);
+});
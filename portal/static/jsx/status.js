@@ -4,6 +4,8 @@ class Messages extends React.Component {
         this.error = this.error.bind(this)
         this.update = this.update.bind(this)
         this.refresh = this.refresh.bind(this)
+        this.startPolling = this.startPolling.bind(this)
+        this.stopPolling = this.stopPolling.bind(this)
         this.state = {}
     }
 
@@ -23,17 +25,28 @@ class Messages extends React.Component {
     }
 
     refresh(e) {
-        this.componentWillUnmount()
-        this.componentDidMount()
+        if (this.request !== undefined) {
+            this.request.abort()
+        }
+        this.update()
+    }
+
+    startPolling() {
+        clearInterval(this.interval)
+        this.interval = setInterval(this.update, 3 * 60 * 1000)
+    }
+
+    stopPolling() {
+        clearInterval(this.interval)
     }
 
     componentDidMount() {
         this.update()
-        this.interval = setInterval(this.update, 3 * 60 * 1000)
+        this.startPolling()
     }
 
     componentWillUnmount() {
-        clearInterval(this.interval)
+        this.stopPolling()
         if (this.request !== undefined) {
             this.request.abort()
         }
@@ -62,6 +75,8 @@ class Courses extends React.Component {
         this.error = this.error.bind(this)
         this.update = this.update.bind(this)
         this.refresh = this.refresh.bind(this)
+        this.startPolling = this.startPolling.bind(this)
+        this.stopPolling = this.stopPolling.bind(this)
         this.state = {}
     }
 
@@ -81,17 +96,28 @@ class Courses extends React.Component {
     }
 
     refresh(e) {
-        this.componentWillUnmount()
-        this.componentDidMount()
+        if (this.request !== undefined) {
+            this.request.abort()
+        }
+        this.update()
+    }
+
+    startPolling() {
+        clearInterval(this.interval)
+        this.interval = setInterval(this.update, 3 * 60 * 1000)
+    }
+
+    stopPolling() {
+        clearInterval(this.interval)
     }
 
     componentDidMount() {
         this.update()
-        this.interval = setInterval(this.update, 3 * 60 * 1000)
+        this.startPolling()
     }
 
     componentWillUnmount() {
-        clearInterval(this.interval)
+        this.stopPolling()
         if (this.request !== undefined) {
             this.request.abort()
         }
@@ -109,6 +135,7 @@ class Courses extends React.Component {
                                     <th>Course</th>
                                     <th># Tickets</th>
                                     <th># Tutors</th>
+                                    <th>Est. Wait</th>
                                 </tr>
                             </thead>
                             <tbody>
@@ -117,6 +144,7 @@ class Courses extends React.Component {
                                         <td>{item.name}</td>
                                         <td className="centered">{item.current_tickets}</td>
                                         <td className="centered">{item.current_tutors}</td>
+                                        <td className="centered">{item.estimated_wait === null ? '-' : item.estimated_wait + ' min'}</td>
                                     </tr>
                                 ))}
                             </tbody>
@@ -152,6 +180,34 @@ class Status extends React.Component {
         this.courses.refresh(e)
     }
 
+    componentDidMount() {
+        // the server pushes a new snapshot when something changes
+        // polling is only used while the stream is unavailable
+        // the stream is only offered when the server has it turned on
+        const root = document.getElementById("root")
+        if (window.EventSource === undefined || !root.hasAttribute("data-stream")) {
+            return
+        }
+        this.stream = new EventSource('/api/status/stream')
+        this.stream.addEventListener('status', (e) => {
+            const data = JSON.parse(e.data)
+            this.messages.stopPolling()
+            this.courses.stopPolling()
+            this.messages.setState({messages: data.messages})
+            this.courses.setState({courses: data.courses})
+        })
+        this.stream.onerror = () => {
+            this.messages.startPolling()
+            this.courses.startPolling()
+        }
+    }
+
+    componentWillUnmount() {
+        if (this.stream !== undefined) {
+            this.stream.close()
+        }
+    }
+
     render() {
         let body
         if (this.state.error === undefined) {
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+
+import bisect
+import datetime
+from collections import Counter, defaultdict
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from . import model as m
+
+# ticket attributes that decide how a ticket is counted
+FIELDS = (
+    'time_created',
+    'time_closed',
+    'status',
+    'section_id',
+    'problem_type_id',
+    'tutor_id',
+    'session_duration',
+    'was_successful',
+)
+
+
+def utc(time):
+    r"""
+    Converts a time to a naive UTC time
+    Times read from the database are already naive UTC
+    """
+    if time is not None and time.tzinfo is not None:
+        time = time.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return time
+
+
+def ticket_state(ticket):
+    r"""
+    Gets the attributes of a ticket that are counted
+    Takes a ticket or a row that has the same attribute names
+    """
+    return {name: getattr(ticket, name) for name in FIELDS}
+
+
+def contribution(state):
+    r"""
+    Gets the DailyStats key and totals that one ticket adds
+    """
+    created = utc(state['time_created'])
+    key = (
+        created.date(),
+        state['section_id'],
+        int(state['problem_type_id'] or 0),
+        int(state['tutor_id'] or 0),
+    )
+    totals = {'tickets': 1}
+    if state['status'] == m.Status.Closed:
+        totals['closed'] = 1
+        if state['session_duration'] is not None:
+            totals['duration_sum'] = state['session_duration']
+            totals['duration_count'] = 1
+        if state['was_successful']:
+            totals['successful'] = 1
+        closed = utc(state['time_closed'])
+        if closed is not None:
+            minutes = (closed - created).total_seconds() / 60
+            bucket = bisect.bisect_left(m.WAIT_BUCKETS, minutes)
+            totals[m.DailyStats.waits[bucket]] = 1
+    return key, totals
+
+
+def key_filter(key):
+    day, section_id, problem_type_id, tutor_id = key
+    return {
+        'day': day,
+        'section_id': section_id,
+        'problem_type_id': problem_type_id,
+        'tutor_id': tutor_id,
+    }
+
+
+def increment(session, key, totals):
+    r"""
+    Adds totals to an existing DailyStats row
+    Returns the number of rows updated, 0 if there is no row yet
+    """
+    return session.query(m.DailyStats).\
+        filter_by(**key_filter(key)).\
+        update({
+            name: getattr(m.DailyStats, name) + value
+            for name, value in totals.items()
+        }, synchronize_session=False)
+
+
+def record(session, before, after):
+    r"""
+    Updates the daily statistics for a change to a ticket
+    before and after are ticket states, None if the ticket didn't exist
+    Issues an update for each affected row, or an insert for a new row
+    Must be called in the same transaction as the change
+    """
+    changes = defaultdict(Counter)
+    for sign, state in ((-1, before), (1, after)):
+        if state is not None:
+            key, totals = contribution(state)
+            for name, value in totals.items():
+                changes[key][name] += sign * value
+
+    for key, totals in changes.items():
+        totals = {name: value for name, value in totals.items() if value}
+        if not totals:
+            continue
+        if increment(session, key, totals):
+            continue
+        try:
+            # another transaction may insert the same row first,
+            # the savepoint only undoes this insert if it does
+            with session.begin_nested():
+                session.add(m.DailyStats(**key_filter(key), **totals))
+        except IntegrityError:
+            increment(session, key, totals)
+
+
+def rebuild(session, batch_size=1000):
+    r"""
+    Recomputes the daily statistics from every ticket
+    Fixes any drift, for example from tickets edited outside the app
+    Returns the number of rows created
+    """
+    rows = defaultdict(Counter)
+    tickets = session.query(
+        *[getattr(m.Tickets, name) for name in FIELDS]).\
+        yield_per(batch_size)
+    for ticket in tickets:
+        key, totals = contribution(ticket_state(ticket))
+        rows[key].update(totals)
+
+    session.query(m.DailyStats).delete(synchronize_session=False)
+    session.bulk_insert_mappings(m.DailyStats, [
+        dict(key_filter(key), **totals)
+        for key, totals in rows.items()
+    ])
+    return len(rows)
+
+
+def median_wait(waits):
+    r"""
+    Estimates the median wait in minutes from a wait histogram
+    Interpolates within the bucket holding the median
+    Waits over the largest bucket are reported as the largest bucket
+    """
+    count = sum(waits)
+    if not count:
+        return None
+    half = count / 2
+    seen = 0
+    lower = 0
+    for upper, n in zip(m.WAIT_BUCKETS, waits):
+        if n and seen + n >= half:
+            return round(lower + (upper - lower) * (half - seen) / n, 1)
+        seen += n
+        lower = upper
+    return float(m.WAIT_BUCKETS[-1])
+
+
+def summary(row):
+    r"""
+    Adds averages, rates, and the median wait to a row of totals
+    """
+    totals = {
+        name: int(getattr(row, name) or 0)
+        for name in m.DailyStats.totals
+    }
+    closed = totals['closed']
+    durations = totals['duration_count']
+    return {
+        'tickets': totals['tickets'],
+        'closed': closed,
+        'duration_sum': totals['duration_sum'],
+        'avg_duration': round(totals['duration_sum'] / durations, 1)
+        if durations else None,
+        'successful': totals['successful'],
+        'success_rate': round(totals['successful'] / closed, 3)
+        if closed else None,
+        'median_wait': median_wait(
+            [totals[name] for name in m.DailyStats.waits]),
+    }
+
+
+# the columns statistics can be grouped by
+GROUPS = {
+    'day': m.DailyStats.day,
+    'course': m.Sections.course_id,
+    'section': m.DailyStats.section_id,
+    'problem_type': m.DailyStats.problem_type_id,
+    'tutor': m.DailyStats.tutor_id,
+}
+
+
+def query(session, group=None, min_date=None, max_date=None,
+          semester=None, course=None):
+    r"""
+    Gets the statistics for a date range, optionally grouped
+    Reads only the daily statistics, so the cost depends on the number
+        of days and groups rather than the number of tickets
+    Returns a list of (group value, summary) pairs
+    """
+    columns = [
+        func.sum(getattr(m.DailyStats, name)).label(name)
+        for name in m.DailyStats.totals
+    ]
+    if group is not None:
+        columns.insert(0, GROUPS[group].label('group'))
+
+    rows = session.query(*columns).\
+        select_from(m.DailyStats).\
+        join(m.Sections, m.Sections.id == m.DailyStats.section_id)
+    if min_date is not None:
+        rows = rows.filter(m.DailyStats.day >= min_date)
+    if max_date is not None:
+        rows = rows.filter(m.DailyStats.day <= max_date)
+    if semester is not None:
+        rows = rows.filter(m.Sections.semester_id == semester)
+    if course is not None:
+        rows = rows.filter(m.Sections.course_id == course)
+    if group is not None:
+        rows = rows.group_by(GROUPS[group]).order_by(GROUPS[group])
+
+    return [
+        (row.group if group is not None else None, summary(row))
+        for row in rows
+        if row.tickets
+    ]
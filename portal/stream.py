@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+import json
+import threading
+import time
+
+
+class BrokerFull(Exception):
+    r"""
+    Raised when the broker already has the maximum number of clients
+    """
+
+
+class StatusBroker(object):
+    r"""
+    Pushes status page snapshots to connected displays as Server-Sent Events
+    A snapshot is computed and serialized once per data version
+        and the same event is sent to every connected client
+    The number of clients is bounded, extra clients should fall back
+        to polling the JSON api
+    """
+
+    def __init__(self, snapshot, version, max_clients=500,
+                 poll_interval=5, heartbeat=30, lifetime=600):
+        r"""
+        snapshot: returns the json serializable status payload
+        version: returns a value that changes whenever the payload may have
+        poll_interval: seconds between version checks, picks up changes
+            made by other worker processes
+        heartbeat: seconds between keep-alive comments
+        lifetime: seconds before a stream is closed so the client reconnects
+        """
+        self.snapshot = snapshot
+        self.version = version
+        self.max_clients = max_clients
+        self.poll_interval = poll_interval
+        self.heartbeat = heartbeat
+        self.lifetime = lifetime
+
+        self.lock = threading.Lock()
+        self.changed = threading.Condition()
+        self.clients = 0
+        self.event = (None, None)
+
+    def notify(self):
+        r"""
+        Wakes every connected client to check for a new snapshot
+        """
+        with self.changed:
+            self.changed.notify_all()
+
+    def current(self):
+        r"""
+        Returns the version and serialized event for the latest snapshot
+        """
+        version = self.version()
+        with self.lock:
+            if self.event[0] != version:
+                data = json.dumps(self.snapshot(), separators=(',', ':'))
+                event = 'event: status\ndata: {}\n\n'.format(data)
+                self.event = (version, event)
+            return self.event
+
+    def subscribe(self):
+        r"""
+        Registers a client and returns an iterator of event stream chunks
+        The client's slot is released when the iterator is closed,
+            even if it was never started
+        Raises BrokerFull if there are too many clients
+        """
+        with self.lock:
+            if self.clients >= self.max_clients:
+                raise BrokerFull()
+            self.clients += 1
+        return Subscription(self, self._stream())
+
+    def release(self):
+        r"""
+        Frees the slot of a client that disconnected
+        """
+        with self.lock:
+            self.clients -= 1
+
+    def _stream(self):
+        yield 'retry: {}\n\n'.format(self.poll_interval * 1000)
+        version, event = self.current()
+        yield event
+
+        start = last = time.monotonic()
+        while time.monotonic() - start < self.lifetime:
+            with self.changed:
+                self.changed.wait(self.poll_interval)
+            new_version, event = self.current()
+            if new_version != version:
+                version = new_version
+                last = time.monotonic()
+                yield event
+            elif time.monotonic() - last >= self.heartbeat:
+                last = time.monotonic()
+                yield ': keep-alive\n\n'
+
+
+class Subscription(object):
+    r"""
+    The event stream of one client
+    The WSGI server calls close() once the response is done or dropped,
+        which releases the client's slot in the broker exactly once
+    """
+
+    def __init__(self, broker, events):
+        self.broker = broker
+        self.events = events
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.events)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.events.close()
+        finally:
+            self.broker.release()
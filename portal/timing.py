@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+import time
+import logging
+import threading
+
+import jinja2
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from werkzeug.wsgi import ClosingIterator
+
+log = logging.getLogger(__name__)
+# the timer of the request being handled by each thread
+local = threading.local()
+# longest statement text written to the log
+STATEMENT_LOG_LENGTH = 500
+
+
+class Timer(object):
+    r"""
+    Totals the time spent on one request
+    SQL and template times are added by the hooks below
+        while the request is the current one on its thread
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.render_count = 0
+        self.render_seconds = 0.0
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def header(self):
+        r"""
+        Gets the Server-Timing header value, durations are in milliseconds
+        """
+        return ', '.join([
+            'app;dur={:.1f}'.format(self.elapsed() * 1000),
+            'sql;dur={:.1f};desc="{} statements"'.format(
+                self.sql_seconds * 1000, self.sql_count),
+            'render;dur={:.1f};desc="{} templates"'.format(
+                self.render_seconds * 1000, self.render_count),
+        ])
+
+
+def current():
+    r"""
+    Gets the timer of the current request, None outside of requests
+    """
+    return getattr(local, 'timer', None)
+
+
+def threshold(config, name):
+    r"""
+    Gets a threshold in seconds from a millisecond setting
+    Returns None if the setting is 0 or missing, which turns the log off
+    """
+    value = config.get(name)
+    return int(value) / 1000 if value else None
+
+
+class Timed(object):
+    r"""
+    Measures each request and reports it in a Server-Timing header
+    The header covers the time until the response headers are sent,
+        streamed bodies are included in the log but not the header
+    Requests slower than SLOW_REQUEST_MS are logged
+    Event streams are held open on purpose and are never logged
+    """
+
+    def __init__(self, app, config):
+        self.app = app
+        self.config = config
+
+    def __call__(self, environ, start_response):
+        timer = Timer(self.config)
+        local.timer = timer
+        response = {}
+
+        def timed_start_response(status, headers, exc_info=None):
+            response['status'] = status
+            response['stream'] = any(
+                key.lower() == 'content-type' and
+                value.startswith('text/event-stream')
+                for key, value in headers)
+            headers = list(headers) + [('Server-Timing', timer.header())]
+            return start_response(status, headers, exc_info)
+
+        def finish():
+            if current() is timer:
+                del local.timer
+            slow = threshold(self.config, 'SLOW_REQUEST_MS')
+            elapsed = timer.elapsed()
+            if slow is None or elapsed < slow or response.get('stream'):
+                return
+            log.warning(
+                'Slow request: %s %s %s took %.0f ms, '
+                '%d SQL statements in %.0f ms, '
+                '%d templates in %.0f ms',
+                environ.get('REQUEST_METHOD'),
+                environ.get('PATH_INFO'),
+                response.get('status', '-').split(' ')[0],
+                elapsed * 1000,
+                timer.sql_count, timer.sql_seconds * 1000,
+                timer.render_count, timer.render_seconds * 1000)
+
+        try:
+            body = self.app(environ, timed_start_response)
+        except BaseException:
+            finish()
+            raise
+        return ClosingIterator(body, finish)
+
+
+class TimedTemplate(jinja2.Template):
+    r"""
+    Template that adds its render time to the current request
+    Included and extended templates are part of the outer render
+    """
+
+    def render(self, *args, **kwargs):
+        timer = current()
+        if timer is None:
+            return super().render(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            timer.render_count += 1
+            timer.render_seconds += time.perf_counter() - start
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_statement(conn, cursor, statement, parameters, context,
+                    executemany):
+    conn.info.setdefault('statement_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def end_statement(conn, cursor, statement, parameters, context,
+                  executemany):
+    r"""
+    Adds a statement to the current request
+    Statements slower than SLOW_QUERY_MS are logged
+    Statements that fail are not counted
+    """
+    seconds = time.perf_counter() - conn.info['statement_start'].pop()
+    timer = current()
+    if timer is None:
+        return
+    timer.sql_count += 1
+    timer.sql_seconds += seconds
+    slow = threshold(timer.config, 'SLOW_QUERY_MS')
+    if slow is not None and seconds >= slow:
+        log.warning(
+            'Slow SQL statement took %.0f ms: %s',
+            seconds * 1000, ' '.join(statement.split())[:STATEMENT_LOG_LENGTH])
+
+
+@event.listens_for(Engine, 'handle_error')
+def failed_statement(context):
+    r"""
+    Drops the start time of a statement that raised
+    """
+    connection = context.connection
+    if connection is not None and connection.info.get('statement_start'):
+        connection.info['statement_start'].pop()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import enum
+import random
+import datetime
+import tempfile
+
+import pytest
+import sqlalchemy
+from sqlalchemy import event
+
+# the app connects to its database when it is imported
+DIRECTORY = tempfile.mkdtemp(prefix='portal-tests-')
+os.environ['DB'] = os.path.join(DIRECTORY, 'portal.db')
+os.environ['STATUS_CACHE_DIR'] = os.path.join(DIRECTORY, 'status')
+os.environ['REPORT_DIR'] = os.path.join(DIRECTORY, 'reports')
+for name in ('DB_URL', 'DB_READ', 'DB_READ_URL', 'METRICS_DIR'):
+    os.environ.pop(name, None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from portal import app, db, m, status_cache  # noqa: E402
+
+
+class IntEnum(sqlalchemy.types.TypeDecorator):
+    r"""
+    Stores an enum as its integer value
+    Status and Seasons subclass the sqlalchemy Enum type without listing
+        any values, which SQLite turns into a check no row can pass,
+        so the tests store them the way they are compared in the app
+    """
+    impl = sqlalchemy.Integer
+
+    def __init__(self, names):
+        super().__init__()
+        self.enum = enum.IntEnum('Values', names)
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else int(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else self.enum(value)
+
+
+for table, column, names in (
+        (m.Tickets.__table__, 'ticket_status', 'Open Claimed Closed'),
+        (m.Semesters.__table__, 'semester_season', 'Spring Summer Fall')):
+    table.c[column].type = IntEnum(names)
+    table.constraints = {
+        constraint for constraint in table.constraints
+        if not isinstance(constraint, sqlalchemy.CheckConstraint)
+    }
+
+SUPERUSER = 'tutor0@example.edu'
+
+
+@pytest.fixture
+def populate():
+    r"""
+    Returns a function that replaces the database with generated data
+    Tickets are spread over the last ten days,
+        about a third each open, claimed, and closed
+    """
+    def populate(tickets, courses=10, tutors=10, seed=1):
+        random.seed(seed)
+        today = datetime.date.today()
+        now = datetime.datetime.now(datetime.timezone.utc)
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            semester = m.Semesters(
+                year=today.year, season=m.Seasons.Fall,
+                start_date=today - datetime.timedelta(days=30),
+                end_date=today + datetime.timedelta(days=30))
+            professor = m.Professors(fname='Ada', lname='Lovelace')
+            problem = m.ProblemTypes(description='Syntax')
+            db.session.add_all([semester, professor, problem])
+            db.session.flush()
+
+            sections = []
+            for i in range(courses):
+                course = m.Courses(
+                    number='CIST {}'.format(1000 + i),
+                    name='Course {}'.format(i),
+                    on_display=True)
+                db.session.add(course)
+                db.session.flush()
+                sections.append(m.Sections(
+                    number=1, time='MW', course_id=course.id,
+                    semester_id=semester.id, professor_id=professor.id))
+            db.session.add_all(sections)
+
+            people = []
+            for i in range(tutors):
+                people.append(m.Tutors(
+                    email='tutor{}@example.edu'.format(i),
+                    fname='Tutor', lname=str(i),
+                    is_active=True, is_superuser=i == 0,
+                    is_working=i % 2 == 0))
+            db.session.add_all(people)
+            db.session.flush()
+
+            for i in range(tickets):
+                status = random.choice(
+                    [m.Status.Open, m.Status.Claimed, m.Status.Closed])
+                created = now - datetime.timedelta(
+                    minutes=random.randint(0, 60 * 24 * 10))
+                closed = status == m.Status.Closed
+                db.session.add(m.Tickets(
+                    student_email='student{}@example.edu'.format(i),
+                    student_fname='Student', student_lname=str(i),
+                    assignment='1', question='?',
+                    status=status,
+                    time_created=created,
+                    time_closed=created + datetime.timedelta(minutes=30)
+                    if closed else None,
+                    session_duration=20 if closed else None,
+                    was_successful=closed,
+                    tutor_id=random.choice(people).id
+                    if status != m.Status.Open else None,
+                    section_id=random.choice(sections).id,
+                    problem_type_id=problem.id))
+            db.session.commit()
+        status_cache.invalidate()
+    return populate
+
+
+@pytest.fixture
+def client():
+    r"""
+    A test client logged in as a superuser
+    """
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['username'] = SUPERUSER
+    return client
+
+
+@pytest.fixture
+def statements():
+    r"""
+    Returns a function that gets a url
+        and returns the (statement, parameters) pairs it ran
+    """
+    def statements(client, url):
+        ran = []
+
+        def record(conn, cursor, statement, parameters, context,
+                   executemany):
+            ran.append((statement, parameters))
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            response = client.get(url)
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        assert response.status_code == 200, url
+        return ran
+    return statements
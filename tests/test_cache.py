@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+
+import os
+
+import pytest
+
+from portal import cache
+from conftest import DIRECTORY
+
+
+def test_private_directory_is_created_private():
+    path = os.path.join(DIRECTORY, 'private')
+    assert cache.private_directory(path) == path
+    assert os.stat(path).st_mode & 0o777 == 0o700
+    # already there and private
+    assert cache.private_directory(path) == path
+
+
+def test_private_directory_refuses_shared():
+    path = os.path.join(DIRECTORY, 'shared')
+    os.makedirs(path)
+    os.chmod(path, 0o777)
+    with pytest.raises(PermissionError):
+        cache.private_directory(path)
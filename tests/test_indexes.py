@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import datetime
+
+import pytest
+from sqlalchemy import inspect
+
+from portal import app, db, m, status_cache
+
+# hot pages, and the tables their ticket queries must search by index
+HOT_QUERIES = {
+    'status counts': ('/api/courses', {'tickets'}),
+    'queue': ('/tickets/', {'tickets'}),
+    'report course filter': (
+        '/reports/?course=2&min_date={}', {'tickets', 'sections'}),
+    'report semester filter': (
+        '/reports/?semester=1', {'tickets', 'sections'}),
+}
+
+
+def declared_indexes():
+    return {
+        index.name
+        for table in m.Base.metadata.sorted_tables
+        for index in table.indexes
+    }
+
+
+def query_plan(statement, parameters):
+    connection = db.engine.raw_connection()
+    try:
+        rows = connection.cursor().execute(
+            'EXPLAIN QUERY PLAN ' + statement, parameters)
+        return [row[-1] for row in rows]
+    finally:
+        connection.close()
+
+
+def test_create_indexes_adds_missing(populate):
+    populate(tickets=10)
+    with app.app_context():
+        for name in declared_indexes():
+            db.engine.execute('DROP INDEX {}'.format(name))
+
+        assert set(m.create_indexes(db.engine)) == declared_indexes()
+        assert m.create_indexes(db.engine) == []
+        inspector = inspect(db.engine)
+        existing = {
+            index['name']
+            for table in inspector.get_table_names()
+            for index in inspector.get_indexes(table)
+        }
+        assert declared_indexes() <= existing
+
+
+@pytest.mark.parametrize('name', sorted(HOT_QUERIES))
+def test_hot_query_uses_index(name, populate, client, statements):
+    url, tables = HOT_QUERIES[name]
+    url = url.format(datetime.date.today() - datetime.timedelta(days=3))
+    populate(tickets=300)
+    with app.app_context():
+        for index in declared_indexes():
+            db.engine.execute('DROP INDEX {}'.format(index))
+        m.create_indexes(db.engine)
+
+    client.get(url)
+    status_cache.invalidate()
+    queries = [
+        (statement, parameters)
+        for statement, parameters in statements(client, url)
+        if statement.lstrip().upper().startswith('SELECT') and
+        ' tickets' in statement
+    ]
+    assert queries, 'no ticket queries on ' + url
+
+    with app.app_context():
+        for statement, parameters in queries:
+            plan = query_plan(statement, parameters)
+            for table in tables:
+                lines = [
+                    line for line in plan
+                    if line.split(' ')[1:2] == [table]
+                ]
+                assert lines, (table, plan)
+                assert not any(
+                    line.startswith('SCAN') for line in lines), (table, plan)
+                assert any('INDEX ix_' in line for line in lines), \
+                    (table, plan)
+
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+
+import os
+import time
+
+from portal import cache, jobs, report_jobs, status_cache
+
+
+def submit(client, url='/api/reports/jobs?course=1'):
+    response = client.post(url)
+    assert response.status_code in (200, 202)
+    id = response.get_json()['id']
+    # let the job finish before the next test replaces the database
+    for _ in range(100):
+        if report_jobs.status(id)['status'] in ('done', 'failed'):
+            break
+        time.sleep(0.05)
+    assert report_jobs.status(id)['status'] == 'done'
+    return id
+
+
+def test_job_reused_until_any_worker_writes(populate, client):
+    populate(tickets=20)
+    first = submit(client)
+    assert submit(client) == first
+
+    # a write handled by another worker process sharing the cache
+    cache.StatusCache(status_cache.directory).invalidate()
+    assert submit(client) != first
+
+
+def test_default_directory_is_private():
+    directory = jobs.ReportJobs().directory
+    assert os.stat(directory).st_mode & 0o777 == 0o700
+    assert directory != jobs.ReportJobs().directory
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.dialects import mssql, postgresql, sqlite
+
+from portal import app, db, m
+
+
+@pytest.mark.parametrize('dialect, statement', [
+    (mssql.dialect(), 'ALTER TABLE tickets ADD ticket_version INTEGER NULL'),
+    (sqlite.dialect(), 'ALTER TABLE tickets ADD COLUMN ticket_version INTEGER'),
+    (postgresql.dialect(),
+     'ALTER TABLE tickets ADD COLUMN ticket_version INTEGER'),
+])
+def test_add_column_ddl(dialect, statement):
+    table = m.Tickets.__table__
+    assert m.add_column_ddl(table, table.c.ticket_version, dialect) == \
+        statement
+
+
+def test_add_columns_adds_missing(populate):
+    populate(tickets=10)
+    with app.app_context():
+        db.engine.execute('ALTER TABLE tickets DROP COLUMN ticket_version')
+
+        assert m.add_columns(db.engine) == ['tickets.ticket_version']
+        assert m.add_columns(db.engine) == []
+        columns = inspect(db.engine).get_columns('tickets')
+        assert 'ticket_version' in {column['name'] for column in columns}
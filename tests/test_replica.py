@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import shutil
+import sqlite3
+
+import pytest
+
+from portal import app, db, user_cache
+from conftest import DIRECTORY, SUPERUSER
+
+
+@pytest.fixture
+def replica(monkeypatch, populate):
+    r"""
+    A read replica that is behind
+    The logged in tutor and the newest ticket aren't on it yet
+    """
+    populate(tickets=20)
+    path = os.path.join(DIRECTORY, 'replica.db')
+    with app.app_context():
+        db.session.remove()
+        db.get_engine(app).dispose()
+    shutil.copy(os.environ['DB'], path)
+    connection = sqlite3.connect(path)
+    connection.execute('DELETE FROM tutors WHERE tutor_email = ?', (SUPERUSER,))
+    connection.execute(
+        'DELETE FROM tickets WHERE ticket_id = (SELECT max(ticket_id) '
+        'FROM tickets)')
+    connection.commit()
+    connection.close()
+
+    monkeypatch.setitem(
+        app.config, 'SQLALCHEMY_BINDS', {'replica': 'sqlite:///' + path})
+    user_cache.clear()
+    yield path
+    user_cache.clear()
+    with app.app_context():
+        db.get_engine(app, bind='replica').dispose()
+
+
+@pytest.mark.parametrize('url', ['/reports/', '/stats/', '/status.html'])
+def test_user_is_read_from_primary(replica, client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    with client.session_transaction() as session:
+        assert session.get('username') == SUPERUSER
+
+
+def test_reports_read_replica(replica, client):
+    response = client.get('/reports/')
+    assert b'of 19' in response.data
+
+
+def test_replica_count_not_shown_on_primary(replica, client):
+    assert b'of 19' in client.get('/reports/').data
+    # a user who just wrote reads the primary
+    with client.session_transaction() as session:
+        session['wrote_at'] = time.time()
+    response = client.get('/reports/')
+    assert b'of 20' in response.data
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import tracemalloc
+
+import pytest
+from flask import url_for
+from sqlalchemy.orm import selectinload
+
+from portal import (
+    app, db, m, status_cache, csv_lines, filter_report, fix_dde,
+    report_rows, ticket_url_prefix,
+)
+
+# ticket columns copied when the generated table is doubled
+COLUMNS = [
+    column.name for column in m.Tickets.__table__.columns
+    if column.name != 'ticket_id'
+]
+
+
+def grow(tickets):
+    r"""
+    Doubles the tickets table until it has at least this many rows
+    """
+    columns = ', '.join(COLUMNS)
+    with app.app_context():
+        while m.Tickets.query.count() < tickets:
+            db.session.execute(
+                'INSERT INTO tickets ({0}) SELECT {0} FROM tickets'.format(
+                    columns))
+        db.session.commit()
+        count = m.Tickets.query.count()
+    status_cache.invalidate()
+    return count
+
+
+def download_peak(client):
+    r"""
+    Reads the whole CSV report
+    Returns the number of lines and the peak memory allocated meanwhile
+    """
+    tracemalloc.start()
+    try:
+        response = client.get('/report/file/cslc_report.csv')
+        lines = 0
+        for data in response.response:
+            lines += data.count(b'\n') if isinstance(data, bytes) else \
+                data.count('\n')
+        response.close()
+        return lines, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_csv_report_memory_is_bounded(populate, client):
+    populate(tickets=100)
+    peaks = {}
+    for tickets in (5000, 100000):
+        count = grow(tickets)
+        lines, peaks[count] = download_peak(client)
+        assert lines == count + 1
+    small, large = sorted(peaks)
+    # twenty times the rows, about the same memory
+    assert peaks[large] < 8 * 1024 * 1024, peaks
+    assert peaks[large] < peaks[small] * 1.5, peaks
+
+
+def orm_report_rows(args):
+    r"""
+    The rows of a report built from loaded objects, as the export used to
+    """
+    tickets = filter_report(args).\
+        join(m.ProblemTypes).\
+        join(m.Courses).\
+        join(m.Semesters).\
+        join(m.Professors).\
+        order_by(m.Tickets.id.desc()).\
+        options(
+            selectinload(m.Tickets.tutor),
+            selectinload(m.Tickets.assistant_tutor))
+    yield [
+        list(map(fix_dde, [
+            url_for('ticket_details', id=ticket.id, _external=True),
+            ticket.student_email,
+            ticket.student_fname,
+            ticket.student_lname,
+            ticket.assignment,
+            ticket.question,
+            ticket.problem_type.description,
+            ticket.status.name if ticket.status else 'Unknown',
+            ticket.time_created or 'Unknown',
+            ticket.time_closed or 'Not closed yet',
+            ticket.was_successful,
+            ticket.tutor or 'None',
+            ticket.assistant_tutor or 'None',
+            ticket.section.semester.title,
+            ticket.section.course.number,
+            ticket.section.number,
+            ticket.section.professor.last_first,
+        ]))
+        for ticket in tickets
+    ]
+
+
+@pytest.mark.parametrize('args', [
+    {},
+    {'course': '2'},
+    {'semester': '1', 'course': '3'},
+    {'min_date': '2000-01-01', 'max_date': '2100-01-01'},
+])
+def test_csv_report_matches_orm_rows(populate, args):
+    populate(tickets=300)
+    with app.app_context():
+        # assistants, and cells the export must defuse
+        for ticket in m.Tickets.query.filter(m.Tickets.id % 3 == 0):
+            ticket.assistant_tutor_id = ticket.tutor_id
+            ticket.question = '=SUM(A1:A9)'
+            ticket.assignment = 'Lab 1  '
+        db.session.commit()
+
+    with app.test_request_context():
+        rows = ''.join(csv_lines(report_rows(
+            args, ticket_url_prefix(), batch_size=7)))
+        expected = ''.join(csv_lines(orm_report_rows(args)))
+    assert rows.count('\n') > 10
+    assert rows == expected
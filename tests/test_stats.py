@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import datetime
+
+from portal import app, db, m, stats
+
+
+def daily_stats():
+    return sorted(
+        tuple(getattr(row, name) for name in ('day', 'section_id',
+              'problem_type_id', 'tutor_id', *m.DailyStats.totals))
+        for row in m.DailyStats.query
+    )
+
+
+def new_ticket(**values):
+    ticket = m.Tickets(
+        student_email='new@example.edu', assignment='1', question='?',
+        status=m.Status.Open, section_id=1, problem_type_id=1,
+        time_created=datetime.datetime.now(datetime.timezone.utc))
+    for name, value in values.items():
+        setattr(ticket, name, value)
+    return ticket
+
+
+def rebuilt():
+    stats.rebuild(db.session)
+    db.session.commit()
+    return daily_stats()
+
+
+def test_record_matches_rebuild(populate):
+    populate(tickets=50)
+    with app.app_context():
+        stats.rebuild(db.session)
+        db.session.commit()
+        for values in ({}, {'tutor_id': 2}, {'section_id': 3}):
+            ticket = new_ticket(**values)
+            db.session.add(ticket)
+            db.session.flush()
+            stats.record(db.session, None, stats.ticket_state(ticket))
+            db.session.commit()
+        recorded = daily_stats()
+        assert recorded == rebuilt()
+
+
+def test_record_concurrent_insert(populate, monkeypatch):
+    r"""
+    Another transaction adds the row between the update and the insert
+    """
+    populate(tickets=50)
+    with app.app_context():
+        stats.rebuild(db.session)
+        first = new_ticket()
+        db.session.add(first)
+        db.session.flush()
+        stats.record(db.session, None, stats.ticket_state(first))
+        db.session.commit()
+
+        increment = stats.increment
+        calls = []
+
+        def missed(session, key, totals):
+            calls.append(key)
+            if len(calls) == 1:
+                # the row is there, but wasn't when this update ran
+                return 0
+            return increment(session, key, totals)
+        monkeypatch.setattr(stats, 'increment', missed)
+
+        ticket = new_ticket()
+        db.session.add(ticket)
+        db.session.flush()
+        stats.record(db.session, None, stats.ticket_state(ticket))
+        db.session.commit()
+
+        assert len(calls) == 2
+        assert m.Tickets.query.get(ticket.id) is not None
+        recorded = daily_stats()
+        assert recorded == rebuilt()
+
+
+def test_bad_date_is_rejected(populate, client):
+    populate(tickets=10)
+    for url in ('/api/stats', '/stats/'):
+        assert client.get(url + '?min_date=2020-01-01').status_code == 200
+        response = client.get(url + '?min_date=bad')
+        assert response.status_code == 400
+        assert b'YYYY-MM-DD' in response.data
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+
+from portal import status_cache
+
+
+def test_course_status_statements_do_not_grow_with_courses(
+        populate, client, statements):
+    counts = {}
+    for courses in (10, 500):
+        populate(tickets=courses * 5, courses=courses, tutors=courses)
+        # the first request also loads the configuration
+        client.get('/api/courses')
+        status_cache.invalidate()
+        ran = statements(client, '/api/courses')
+        assert any('GROUP BY' in statement for statement, _ in ran), ran
+        counts[courses] = len(ran)
+    assert counts[10] == counts[500], counts
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+
+import pytest
+
+import portal
+from portal import stream
+
+
+def test_unstarted_stream_releases_its_slot():
+    broker = stream.StatusBroker(lambda: {}, lambda: 1, max_clients=1)
+    broker.subscribe().close()
+    events = broker.subscribe()
+    with pytest.raises(stream.BrokerFull):
+        broker.subscribe()
+    events.close()
+    events.close()
+    assert broker.clients == 0
+
+
+def test_dropped_response_releases_its_slot(
+        populate, client, monkeypatch):
+    populate(tickets=10)
+    monkeypatch.setattr(portal, 'STATUS_STREAM', True)
+    broker = portal.status_broker
+    clients = broker.clients
+    response = client.get('/api/status/stream')
+    assert response.status_code == 200
+    assert broker.clients == clients + 1
+    # dropped without being read
+    response.close()
+    assert broker.clients == clients
+
+    response = client.get('/api/status/stream')
+    assert next(response.response).startswith(b'retry:')
+    response.close()
+    assert broker.clients == clients
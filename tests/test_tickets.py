@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+
+from portal import app, m, ticket_queue
+
+
+def queue_size():
+    with app.test_request_context():
+        return ticket_queue().count()
+
+
+def test_queue_statements_do_not_grow_with_tickets(
+        populate, client, statements):
+    counts = {}
+    for tickets in (50, 500):
+        # related rows grow too, lazy loads happen once per distinct row
+        populate(tickets=tickets, courses=tickets // 10)
+        # the first request also loads the user and configuration
+        client.get('/tickets/')
+        counts[tickets] = len(statements(client, '/tickets/'))
+        # most of the generated tickets are on the queue
+        assert queue_size() > tickets / 2
+    assert counts[50] == counts[500], counts
+
+
+def test_queue_page_lists_every_ticket(populate, client):
+    populate(tickets=50)
+    response = client.get('/tickets/')
+    assert response.status_code == 200
+    with app.app_context():
+        for ticket in m.Tickets.query:
+            if ticket.status != m.Status.Closed:
+                assert 'data-id="{}"'.format(ticket.id).encode() in \
+                    response.data
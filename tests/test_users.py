@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+
+from portal import app, cache, db, m, status_cache
+from conftest import SUPERUSER
+
+
+def test_deactivated_by_another_worker(populate, client):
+    populate(tickets=10)
+    assert client.get('/reports/').status_code == 200
+
+    # another worker process deactivates the tutor
+    with app.app_context():
+        m.Tutors.query.filter_by(email=SUPERUSER).update(
+            {'is_active': False})
+        db.session.commit()
+    assert client.get('/reports/').status_code == 200
+    cache.StatusCache(status_cache.directory).invalidate()
+
+    assert client.get('/reports/').status_code == 403